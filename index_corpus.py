@@ -0,0 +1,334 @@
+import argparse
+import csv
+import glob
+import os
+import re
+import sqlite3
+import time
+from urllib.parse import urlparse
+
+# 索引数据库默认路径
+DEFAULT_DB = '山西文旅新闻索引.db'
+
+# 表结构版本，结构变化时需要重建索引
+SCHEMA_VERSION = 3
+
+# CJK字符（汉字）与英文/数字词
+CJK_RUN = re.compile('[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+TOKEN = re.compile('[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[A-Za-z0-9]+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS news (
+    id      INTEGER PRIMARY KEY,
+    title   TEXT NOT NULL,
+    date    TEXT NOT NULL,
+    link    TEXT NOT NULL UNIQUE,
+    content TEXT NOT NULL,
+    source  TEXT NOT NULL,
+    host    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_news_date ON news(date);
+CREATE INDEX IF NOT EXISTS idx_news_month_day ON news(substr(date, 6, 5));
+CREATE INDEX IF NOT EXISTS idx_news_source ON news(source);
+CREATE INDEX IF NOT EXISTS idx_news_host ON news(host);
+
+-- 全文索引只保存分词后的倒排，不重复存储原文（rowid = news.id）
+-- *_bi 为CJK二元分词，*_uni 为逐字分词（用于单字和边界不完整的关键词）
+CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+    title_bi, content_bi, title_uni, content_uni, content='', tokenize='unicode61'
+);
+
+-- 已索引的CSV文件，用于增量索引时跳过未变化的文件
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path  TEXT PRIMARY KEY,
+    size  INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+"""
+
+
+def bigram_tokens(text):
+    """CJK二元分词：汉字按相邻两字切分，英文/数字按词切分"""
+    tokens = []
+    for match in TOKEN.finditer(text or ''):
+        word = match.group(0)
+        if CJK_RUN.fullmatch(word):
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word.lower())
+    return tokens
+
+
+def unigram_tokens(text):
+    """逐字分词：汉字、英文字母和数字每个字符作为一个词"""
+    return [char for word in TOKEN.findall(text or '') for char in word.lower()]
+
+
+def build_match_query(keywords):
+    """把关键词转换为FTS5短语查询，多个关键词之间为AND
+
+    两字及以上的纯汉字关键词用二元分词列查询；单字、中英混合等关键词
+    （如“晋”“10月”）的二元词可能不在索引中，改用逐字分词列做短语查询。
+    """
+    phrases = []
+    for keyword in keywords:
+        keyword = keyword.strip()
+        if CJK_RUN.fullmatch(keyword) and len(keyword) >= 2:
+            phrases.append('{title_bi content_bi} : "' + ' '.join(bigram_tokens(keyword)) + '"')
+        else:
+            phrases.append('{title_uni content_uni} : "' + ' '.join(unigram_tokens(keyword)) + '"')
+    return ' AND '.join(phrases)
+
+
+def open_db(db_path):
+    """打开索引数据库并确保表结构存在（结构版本不一致时清空重建）"""
+    conn = sqlite3.connect(db_path)
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version != SCHEMA_VERSION:
+        tables = [name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN "
+            "('news', 'news_fts', 'ingested_files')")]
+        if tables:
+            print(f"  ⚠ 索引结构已更新，清空旧索引，请重新执行 index")
+        for name in tables:
+            conn.execute(f'DROP TABLE IF EXISTS {name}')
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def fts_values(title, content):
+    """生成全文索引各列的分词文本"""
+    return (' '.join(bigram_tokens(title)), ' '.join(bigram_tokens(content)),
+            ' '.join(unigram_tokens(title)), ' '.join(unigram_tokens(content)))
+
+
+def index_csv(conn, path):
+    """增量索引单个CSV文件，返回(新增条数, 更新条数)；文件未变化时返回None"""
+    stat = os.stat(path)
+    row = conn.execute('SELECT size, mtime FROM ingested_files WHERE path = ?',
+                       (os.path.abspath(path),)).fetchone()
+    if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+        return None
+
+    added = 0
+    updated = 0
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        # 逐行读取，不把整个文件载入内存
+        for record in csv.DictReader(f):
+            link = (record.get('链接') or '').strip()
+            if not link:
+                continue
+
+            title = record.get('标题') or ''
+            content = record.get('内容') or ''
+            date = (record.get('日期') or '').strip()
+            source = (record.get('来源') or '').strip()
+
+            old = conn.execute('SELECT id, title, date, content, source FROM news WHERE link = ?',
+                               (link,)).fetchone()
+            if old is None:
+                cursor = conn.execute(
+                    'INSERT INTO news (title, date, link, content, source, host) VALUES (?, ?, ?, ?, ?, ?)',
+                    (title, date, link, content, source, urlparse(link).netloc.lower()))
+                news_id = cursor.lastrowid
+                added += 1
+            elif old[1:] != (title, date, content, source):
+                # 同一链接内容有变化（main.py每次运行都会重写CSV）：更新记录，
+                # 并用旧的分词文本从无原文全文索引中删除旧条目
+                news_id = old[0]
+                conn.execute(
+                    "INSERT INTO news_fts (news_fts, rowid, title_bi, content_bi, title_uni, content_uni) "
+                    "VALUES ('delete', ?, ?, ?, ?, ?)",
+                    (news_id,) + fts_values(old[1], old[3]))
+                conn.execute('UPDATE news SET title = ?, date = ?, content = ?, source = ? WHERE id = ?',
+                             (title, date, content, source, news_id))
+                updated += 1
+            else:
+                continue
+
+            conn.execute(
+                'INSERT INTO news_fts (rowid, title_bi, content_bi, title_uni, content_uni) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (news_id,) + fts_values(title, content))
+
+    conn.execute('INSERT OR REPLACE INTO ingested_files (path, size, mtime) VALUES (?, ?, ?)',
+                 (os.path.abspath(path), stat.st_size, stat.st_mtime))
+    conn.commit()
+    return added, updated
+
+
+def cmd_index(args):
+    """索引命令"""
+    conn = open_db(args.db)
+    paths = args.csv or sorted(glob.glob('*.csv'))
+
+    for path in paths:
+        start = time.perf_counter()
+        result = index_csv(conn, path)
+        if result is None:
+            print(f"  - {path}: 未变化，跳过")
+        else:
+            added, updated = result
+            print(f"  ✓ {path}: 新增 {added} 条，更新 {updated} 条 "
+                  f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    total = conn.execute('SELECT COUNT(*) FROM news').fetchone()[0]
+    print(f"索引共 {total} 条新闻: {args.db}")
+    conn.close()
+
+
+def cmd_query(args):
+    """查询命令"""
+    conn = open_db(args.db)
+
+    sql = 'SELECT news.title, news.date, news.link, news.source FROM news'
+    where = []
+    params = []
+
+    match = build_match_query(args.keyword or [])
+    if match:
+        sql += ' JOIN news_fts ON news_fts.rowid = news.id'
+        where.append('news_fts MATCH ?')
+        params.append(match)
+
+    if args.date:
+        if re.fullmatch(r'\d{4}-\d{2}-\d{2}', args.date):
+            where.append('news.date = ?')
+            params.append(args.date)
+        elif re.fullmatch(r'\d{4}-\d{2}', args.date):
+            # 年-月（如2025-10）匹配该月所有日期，包括只精确到月的记录
+            where.append('news.date >= ? AND news.date < ?')
+            params.extend([args.date, args.date + '\U0010ffff'])
+        else:
+            # 只给出月-日（如10-03）时匹配任意年份
+            where.append('substr(news.date, 6, 5) = ?')
+            params.append(args.date)
+
+    if args.source:
+        # 来源按前缀匹配（如“人民网”匹配“人民网山西”），用范围条件以便命中索引
+        where.append('news.source >= ? AND news.source < ?')
+        params.extend([args.source, args.source + '\U0010ffff'])
+
+    if args.host:
+        where.append('news.host = ?')
+        params.append(args.host.lower())
+
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY news.date, news.id LIMIT ?'
+    params.append(args.limit)
+
+    start = time.perf_counter()
+    rows = conn.execute(sql, params).fetchall()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    for i, (title, date, link, source) in enumerate(rows, start=1):
+        print(f"\n{i}. 【{source}】{date}")
+        print(f"   标题: {title[:60]}")
+        print(f"   链接: {link[:120]}")
+
+    print(f"\n共 {len(rows)} 条结果 ({elapsed:.1f} ms)")
+    conn.close()
+
+
+def cmd_check(args):
+    """校验全文索引：逐个关键词对比FTS查询与LIKE全表扫描的结果"""
+    conn = open_db(args.db)
+    keywords = args.keyword or ['晋', '10月', '五台山', '平遥古城', '国庆', '山西文旅', 'A级']
+
+    mismatches = 0
+    for keyword in keywords:
+        fts_ids = {row[0] for row in conn.execute(
+            'SELECT rowid FROM news_fts WHERE news_fts MATCH ?', (build_match_query([keyword]),))}
+        pattern = '%' + keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        like_ids = {row[0] for row in conn.execute(
+            "SELECT id FROM news WHERE title LIKE ? ESCAPE '\\' OR content LIKE ? ESCAPE '\\'",
+            (pattern, pattern))}
+
+        if fts_ids == like_ids:
+            print(f"  ✓ {keyword}: {len(fts_ids)} 条")
+        else:
+            mismatches += 1
+            print(f"  ✗ {keyword}: FTS {len(fts_ids)} 条 / LIKE {len(like_ids)} 条"
+                  f"（FTS缺少 {len(like_ids - fts_ids)} 条，多出 {len(fts_ids - like_ids)} 条）")
+
+    conn.close()
+    if mismatches:
+        raise SystemExit(1)
+
+
+def cmd_audit(args):
+    """链接健康检查（对应check_csv.py中的人工检查）"""
+    conn = open_db(args.db)
+    start = time.perf_counter()
+
+    checks = [
+        ('链接格式异常（非http）', "SELECT COUNT(*) FROM news WHERE link NOT LIKE 'http%'", ()),
+        ('搜狗微信跳转链接', 'SELECT COUNT(*) FROM news WHERE host = ?', ('weixin.sogou.com',)),
+        ('真实微信公众号文章链接', 'SELECT COUNT(*) FROM news WHERE host = ?', ('mp.weixin.qq.com',)),
+        ('示例数据链接', 'SELECT COUNT(*) FROM news WHERE host = ?', ('example.com',)),
+    ]
+
+    print("=" * 100)
+    print("链接健康检查:")
+    print("=" * 100)
+    for label, sql, params in checks:
+        print(f"  {label}: {conn.execute(sql, params).fetchone()[0]} 条")
+
+    print("\n主机分布（前10）:")
+    for host, count in conn.execute(
+            'SELECT host, COUNT(*) AS n FROM news GROUP BY host ORDER BY n DESC LIMIT 10'):
+        print(f"  • {host or '(无)'}: {count} 条")
+
+    print(f"\n({(time.perf_counter() - start) * 1000:.1f} ms)")
+    conn.close()
+
+
+def keyword_arg(value):
+    """校验关键词参数：必须包含至少一个汉字、字母或数字"""
+    if not unigram_tokens(value):
+        raise argparse.ArgumentTypeError(f"关键词必须包含汉字、字母或数字: {value}")
+    return value
+
+
+def date_arg(value):
+    """校验 --date 参数格式"""
+    if not re.fullmatch(r'\d{4}-\d{2}-\d{2}|\d{4}-\d{2}|\d{2}-\d{2}', value):
+        raise argparse.ArgumentTypeError(f"日期格式应为 YYYY-MM-DD、YYYY-MM 或 MM-DD: {value}")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='山西文旅新闻爬取结果索引与查询工具')
+    parser.add_argument('--db', default=DEFAULT_DB, help='索引数据库路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = subparsers.add_parser('index', help='增量索引CSV（默认当前目录所有CSV）')
+    index_parser.add_argument('csv', nargs='*', help='要索引的CSV文件')
+    index_parser.set_defaults(func=cmd_index)
+
+    query_parser = subparsers.add_parser('query', help='查询新闻')
+    query_parser.add_argument('-k', '--keyword', action='append', type=keyword_arg, help='标题/内容关键词，可重复')
+    query_parser.add_argument('-d', '--date', type=date_arg, help='日期，如 2025-10-03、2025-10 或 10-03')
+    query_parser.add_argument('-s', '--source', help='来源（前缀匹配），如 人民网')
+    query_parser.add_argument('--host', help='链接主机，如 weixin.sogou.com')
+    query_parser.add_argument('-n', '--limit', type=int, default=20, help='最多返回条数')
+    query_parser.set_defaults(func=cmd_query)
+
+    check_parser = subparsers.add_parser('check', help='校验全文索引结果与LIKE扫描一致')
+    check_parser.add_argument('-k', '--keyword', action='append', type=keyword_arg, help='要校验的关键词，可重复')
+    check_parser.set_defaults(func=cmd_check)
+
+    audit_parser = subparsers.add_parser('audit', help='链接健康检查')
+    audit_parser.set_defaults(func=cmd_audit)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
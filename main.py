@@ -1,12 +1,13 @@
 import requests
 from bs4 import BeautifulSoup
 import csv
+import codecs
 from datetime import datetime
 import time
 import re
 from urllib.parse import urljoin, urlparse, quote
 import json
-from collections import deque
+import heapq
 import random
 
 # Selenium相关导入
@@ -26,7 +27,7 @@ except ImportError:
 class ShanxiTourismNewsCrawler:
     """山西文旅新闻全网自动化爬虫 - 增强版"""
 
-    def __init__(self, use_selenium=True):
+    def __init__(self, use_selenium=True, focused=False):
         # 多个User-Agent轮换
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
@@ -48,19 +49,35 @@ class ShanxiTourismNewsCrawler:
         # 创建Session
         self.session = requests.Session()
 
-        # 设置重试策略
+        # 连接池适配器（重试统一由safe_request负责，这里不再叠加urllib3重试）
         from requests.adapters import HTTPAdapter
-        from urllib3.util.retry import Retry
-
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+
+        adapter = HTTPAdapter(max_retries=0)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
 
+        # 统一重试策略
+        self.retry_budget = 60          # 整个爬取过程允许的重试总次数
+        self.request_deadline = 30      # 单个URL（含所有重试）的最长耗时（秒）
+        self.backoff_base = 1           # 指数退避基数（秒）
+        self.backoff_max = 8            # 单次退避上限（秒）
+
+        # 按主机熔断
+        self.breaker_threshold = 5      # 连续失败多少次后熔断
+        self.breaker_cooldown = 120     # 熔断后多久允许半开探测（秒）
+        self.host_states = {}           # host -> {'state', 'failures', 'opened_at'}
+
+        # 聚焦爬取配置（按相关度优先扩展站内链接）
+        self.focused = focused
+        self.focus_max_depth = 2        # 最大抓取深度（首页为0）
+        self.focus_page_budget = 40     # 每个站点最多请求的页面数
+        self.focus_max_items = 50       # 每个站点最多采集的新闻数
+
+        # 页面流式下载配置
+        self.max_page_bytes = 512 * 1024    # 文章页最多读取的字节数
+        self.max_list_page_bytes = 4 * 1024 * 1024  # 首页/频道页（需收集链接）最多读取的字节数
+        self.chunk_size = 16 * 1024         # 每次读取的块大小
+
         # Selenium配置
         self.use_selenium = use_selenium and SELENIUM_AVAILABLE
         self.driver = None
@@ -123,15 +140,87 @@ class ShanxiTourismNewsCrawler:
         delay = random.uniform(min_seconds, max_seconds)
         time.sleep(delay)
 
+    def breaker_allow(self, host):
+        """判断主机熔断器是否放行请求"""
+        state = self.host_states.get(host)
+        if not state or state['state'] == 'closed':
+            return True
+
+        if state['state'] == 'open':
+            if time.monotonic() - state['opened_at'] < self.breaker_cooldown:
+                return False
+            # 冷却结束，放行一个半开探测请求
+            state['state'] = 'half_open'
+            print(f"  → {host} 熔断冷却结束，发送探测请求")
+            return True
+
+        # half_open: 探测请求仍在进行中，其余请求快速失败
+        return False
+
+    def breaker_record(self, host, success):
+        """记录请求结果并更新主机熔断状态"""
+        state = self.host_states.setdefault(
+            host, {'state': 'closed', 'failures': 0, 'opened_at': 0})
+
+        if success:
+            if state['state'] != 'closed':
+                print(f"  ✓ {host} 探测成功，熔断恢复")
+            state['state'] = 'closed'
+            state['failures'] = 0
+            return
+
+        state['failures'] += 1
+        if state['state'] == 'half_open' or state['failures'] >= self.breaker_threshold:
+            if state['state'] != 'open':
+                print(f"  ✗ {host} 连续失败{state['failures']}次，熔断{self.breaker_cooldown}秒")
+            state['state'] = 'open'
+            state['opened_at'] = time.monotonic()
+
+    def breaker_cancel_probe(self, host):
+        """探测请求因与主机无关的原因未完成时恢复熔断状态，下一个请求重新探测"""
+        state = self.host_states.get(host)
+        if state and state['state'] == 'half_open':
+            state['state'] = 'open'
+
+    def retry_wait(self, attempt, deadline, min_seconds=0):
+        """指数退避等待（带随机抖动），不超过截止时间；返回是否还值得重试"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = max(min_seconds, random.uniform(delay / 2, delay))
+
+        remaining = deadline - time.monotonic()
+        if delay >= remaining:
+            return False
+
+        time.sleep(delay)
+        return True
+
     def safe_request(self, url, method='GET', max_retries=3, **kwargs):
-        """安全的HTTP请求"""
+        """安全的HTTP请求（统一重试预算 + 截止时间 + 按主机熔断）"""
+        host = urlparse(url).netloc
+        deadline = time.monotonic() + self.request_deadline
+        timeout = kwargs.pop('timeout', 15)
+
         for attempt in range(max_retries):
+            if not self.breaker_allow(host):
+                print(f"  ⚠ {host} 已熔断，跳过: {url[:60]}")
+                return None
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"  ⚠ 超过单请求截止时间({self.request_deadline}秒)，放弃")
+                return None
+
+            if attempt > 0:
+                if self.retry_budget <= 0:
+                    print(f"  ⚠ 全局重试预算已用尽，放弃: {url[:60]}")
+                    return None
+                self.retry_budget -= 1
+
+            wait_min = 0
             try:
                 headers = kwargs.get('headers', self.get_random_headers())
                 kwargs['headers'] = headers
-
-                if 'timeout' not in kwargs:
-                    kwargs['timeout'] = 15
+                kwargs['timeout'] = min(timeout, remaining)
 
                 if method.upper() == 'GET':
                     response = self.session.get(url, **kwargs)
@@ -139,26 +228,55 @@ class ShanxiTourismNewsCrawler:
                     response = self.session.post(url, **kwargs)
 
                 if response.status_code == 200:
+                    # 流式请求此时只收到响应头，由调用方读完正文后再记录结果
+                    if not kwargs.get('stream'):
+                        self.breaker_record(host, True)
                     return response
-                elif response.status_code == 403:
+
+                response.close()  # 流式请求时释放连接
+                if response.status_code == 403:
                     print(f"  ⚠ 访问被拒绝(403)，尝试切换策略...")
-                    self.random_delay(2, 4)
+                    self.breaker_record(host, False)
+                    wait_min = 2
                 elif response.status_code == 429:
                     print(f"  ⚠ 请求过于频繁(429)，等待后重试...")
-                    self.random_delay(5, 10)
+                    self.breaker_record(host, False)
+                    wait_min = 5
+                elif response.status_code >= 500:
+                    print(f"  ⚠ HTTP {response.status_code}")
+                    self.breaker_record(host, False)
                 else:
+                    # 其他4xx说明主机正常但资源不可用，重试无意义
                     print(f"  ⚠ HTTP {response.status_code}")
-
+                    self.breaker_record(host, True)
+                    return None
+
+            except (requests.exceptions.InvalidURL, requests.exceptions.MissingSchema,
+                    requests.exceptions.InvalidSchema) as e:
+                # URL格式错误（如 javascript:、//开头的协议相对链接）与主机无关，重试无意义
+                print(f"  ⚠ 无效链接，跳过: {url[:60]}")
+                self.breaker_cancel_probe(host)
+                return None
             except requests.exceptions.Timeout:
                 print(f"  ⚠ 请求超时，重试中... ({attempt + 1}/{max_retries})")
-                self.random_delay(2, 4)
+                self.breaker_record(host, False)
             except requests.exceptions.ConnectionError:
                 print(f"  ⚠ 连接错误，重试中... ({attempt + 1}/{max_retries})")
-                self.random_delay(2, 4)
+                self.breaker_record(host, False)
+            except requests.exceptions.RequestException as e:
+                print(f"  ⚠ 请求异常: {str(e)[:50]}")
+                self.breaker_record(host, False)
             except Exception as e:
+                # 非网络类异常重试无意义
                 print(f"  ⚠ 请求异常: {str(e)[:50]}")
-                if attempt < max_retries - 1:
-                    self.random_delay(2, 4)
+                self.breaker_cancel_probe(host)
+                return None
+
+            if attempt == max_retries - 1 or self.host_states[host]['state'] == 'open':
+                continue  # 已熔断时无需等待，下一轮直接快速失败
+            if not self.retry_wait(attempt, deadline, wait_min):
+                print(f"  ⚠ 剩余时间不足以重试，放弃: {url[:60]}")
+                return None
 
         return None
 
@@ -530,6 +648,140 @@ class ShanxiTourismNewsCrawler:
         except Exception as e:
             print(f"    ✗ 失败: {str(e)[:50]}")
 
+    def site_domain(self, url):
+        """获取URL所属站点域名（如 wlt.shanxi.gov.cn -> shanxi.gov.cn）"""
+        labels = urlparse(url).netloc.split(':')[0].lower().split('.')
+        if len(labels) >= 3 and labels[-2] in ('gov', 'com', 'org', 'net', 'edu'):
+            return '.'.join(labels[-3:])
+        return '.'.join(labels[-2:])
+
+    def is_non_html_url(self, url):
+        """根据扩展名判断链接是否指向非HTML资源（PDF、图片、视频等）"""
+        path = urlparse(url).path.lower()
+        return bool(re.search(r'\.(pdf|docx?|xlsx?|pptx?|zip|rar|jpe?g|png|gif|mp4|flv|mp3)$', path))
+
+    def score_link(self, title, href):
+        """按锚文本和URL评估链接相关度，返回None表示不值得抓取"""
+        if not href.startswith('http') or self.is_non_html_url(href):
+            return None
+        path = urlparse(href).path.lower()
+
+        score = 0
+        score += 3 * sum(1 for kw in self.keywords if kw in title)
+        score += sum(1 for kw in ['山西', '旅游', '文旅', '景区', '国庆', '假期', '10月', '十月'] if kw in title)
+
+        # 锚文本中的日期落在目标时间段内
+        if self.extract_date_from_text(title):
+            score += 2
+
+        # URL中的日期（如 /202510/t20251003_ 或 /20251003/）
+        if re.search(r'2025[-/_]?10[-/_]?(0[1-9]|10)(?!\d)', href):
+            score += 3
+        elif re.search(r'2025[-/_]?10(?!\d)', href):
+            score += 1
+
+        # 文旅频道页（如 /travel/、/lvyou/、/wlyw/）
+        if re.search(r'travel|lvyou|tour|wenlv|whly|wlyw|/ly/|/wl/', path):
+            score += 1
+
+        return score
+
+    def is_channel_link(self, title, href):
+        """判断链接是否为频道/栏目页（锚文本较短，或URL为目录、index/list页）"""
+        path = urlparse(href).path.lower()
+        return (len(title) < 10 or path == '' or path.endswith('/')
+                or bool(re.search(r'/(index|list|default)[\w-]*\.s?html?$', path)))
+
+    def focused_crawl_site(self, name, start_url, encoding=None):
+        """聚焦爬取单个站点：按相关度优先扩展站内链接，受深度和页面预算限制"""
+        print(f"\n  → {name}（聚焦爬取）")
+
+        domain = self.site_domain(start_url)
+        frontier = [(0, 0, 0, start_url, '')]  # (负相关度, 序号, 深度, URL, 锚文本)
+        queued = {start_url}
+        seq = 1
+        pages = 0
+        count = 0
+
+        while frontier and pages < self.focus_page_budget and count < self.focus_max_items:
+            neg_score, _, depth, url, title = heapq.heappop(frontier)
+
+            if url in self.visited_urls:
+                continue
+            self.visited_urls.add(url)
+
+            if depth > 0:
+                self.random_delay(1, 2)
+            # 只有首页和频道页才展开链接（按列表页读取），其余按文章页读取
+            expand = depth < self.focus_max_depth and (depth == 0 or self.is_channel_link(title, url))
+            soup = self.fetch_html(url, encoding, article=not expand)
+            pages += 1
+            if not soup:
+                continue
+
+            try:
+                # 先收集链接，正文提取会移除导航节点
+                if expand:
+                    for link in soup.find_all('a', href=True):
+                        link_title = link.get_text(strip=True)
+                        href = urljoin(url, link['href']).split('#')[0]
+
+                        if href in queued or href in self.visited_urls:
+                            continue
+                        if self.site_domain(href) != domain:
+                            continue
+
+                        score = self.score_link(link_title, href)
+                        if not score:
+                            continue
+
+                        queued.add(href)
+                        heapq.heappush(frontier, (-score, seq, depth + 1, href, link_title))
+                        seq += 1
+
+                # 首页和频道页（锚文本较短）只用于扩展，不作为新闻记录
+                if depth == 0 or len(title) < 10:
+                    continue
+                if not any(kw in title for kw in ['山西', '旅游', '文旅', '景区', '国庆', '假期', '10月', '十月']):
+                    continue
+
+                content = self.extract_content_from_soup(soup)
+                date_str = self.extract_date_from_text(title + content)
+
+                self.news_data.append({
+                    '标题': title,
+                    '日期': date_str or '2025-10',
+                    '链接': url,
+                    '内容': content[:500] if content else '未获取到内容',
+                    '来源': name
+                })
+                print(f"    ✓ [深度{depth}·相关度{-neg_score}] {title[:40]}...")
+                count += 1
+            except:
+                continue
+
+        print(f"    请求 {pages} 个页面，采集 {count} 条")
+
+    def crawl_focused_sites(self):
+        """聚焦爬取政府网站和主流新闻网站"""
+        print("\n正在聚焦爬取政府网站和主流新闻网站...")
+
+        sites = [
+            {'name': '山西省文化和旅游厅', 'url': 'http://wlt.shanxi.gov.cn/', 'encoding': 'utf-8'},
+            {'name': '太原市文化和旅游局', 'url': 'http://wlj.taiyuan.gov.cn/', 'encoding': 'utf-8'},
+            {'name': '新华网', 'url': 'http://www.sx.xinhuanet.com/', 'encoding': 'utf-8'},
+            {'name': '新华网', 'url': 'http://www.news.cn/travel/', 'encoding': 'utf-8'},
+            {'name': '人民网山西', 'url': 'http://sx.people.com.cn/', 'encoding': 'gb2312'},
+            {'name': '网易新闻', 'url': 'https://news.163.com/travel/', 'encoding': None},
+        ]
+
+        for site in sites:
+            try:
+                self.focused_crawl_site(site['name'], site['url'], site['encoding'])
+                self.random_delay(2, 4)
+            except Exception as e:
+                print(f"  ✗ {site['name']} 爬取失败: {str(e)[:50]}")
+
     def extract_date_from_text(self, text):
         """从文本中提取日期"""
         if not text:
@@ -553,39 +805,112 @@ class ShanxiTourismNewsCrawler:
 
         return ''
 
+    def fetch_html(self, url, encoding=None, article=True):
+        """流式下载页面并解析：按响应头拒绝非HTML内容，限制读取字节数
+
+        article=True 时为文章页，最多读取max_page_bytes；
+        article=False 时为需要收集链接的首页/频道页，最多读取max_list_page_bytes。
+        """
+        if self.is_non_html_url(url):
+            return None
+
+        host = urlparse(url).netloc
+        deadline = time.monotonic() + self.request_deadline
+        max_bytes = self.max_page_bytes if article else self.max_list_page_bytes
+
+        response = self.safe_request(url, stream=True)
+        if not response:
+            return None
+
+        try:
+            content_type = response.headers.get('Content-Type', '').lower()
+            if content_type and 'html' not in content_type and 'xml' not in content_type:
+                print(f"  ⚠ 非HTML内容({content_type.split(';')[0]})，跳过: {url[:60]}")
+                self.breaker_record(host, True)
+                return None
+
+            data = b''
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                data += chunk
+                if len(data) >= max_bytes:
+                    data = data[:max_bytes]
+                    break
+                if time.monotonic() > deadline:
+                    print(f"  ⚠ 读取页面超过截止时间({self.request_deadline}秒)，放弃: {url[:60]}")
+                    self.breaker_record(host, False)
+                    return None
+            self.breaker_record(host, True)
+        except requests.exceptions.RequestException as e:
+            print(f"  ⚠ 读取页面失败: {str(e)[:50]}")
+            self.breaker_record(host, False)
+            return None
+        finally:
+            response.close()
+
+        html = self.decode_html(data, encoding, content_type)
+        return BeautifulSoup(html, 'html.parser')
+
+    def decode_html(self, data, encoding=None, content_type=''):
+        """解码（可能被截断的）页面字节；截断处不完整的字符替换为占位符，不影响整页"""
+        if not encoding:
+            match = re.search(r'charset=["\']?([\w-]+)', content_type)
+            if not match:
+                match = re.search(rb'<meta[^>]+charset=["\']?([\w-]+)', data[:4096], re.I)
+            if match:
+                encoding = match.group(1)
+                if isinstance(encoding, bytes):
+                    encoding = encoding.decode('ascii')
+
+        if encoding:
+            encoding = encoding.lower()
+            # gb2312/gbk页面常含超出字符集的字，统一按超集gb18030解码
+            if encoding in ('gb2312', 'gbk'):
+                encoding = 'gb18030'
+            try:
+                return data.decode(encoding, errors='replace')
+            except LookupError:
+                pass
+
+        # 未声明编码：先按UTF-8解码（允许末尾字符被截断），失败再按gb18030
+        try:
+            return codecs.getincrementaldecoder('utf-8')().decode(data, final=False)
+        except UnicodeDecodeError:
+            return data.decode('gb18030', errors='replace')
+
     def extract_content_from_url(self, url):
         """从URL提取内容"""
         try:
-            response = self.safe_request(url)
-            if not response:
+            soup = self.fetch_html(url)
+            if not soup:
                 return "内容获取失败"
 
-            response.encoding = response.apparent_encoding
-            soup = BeautifulSoup(response.text, 'html.parser')
+            return self.extract_content_from_soup(soup)
+        except Exception as e:
+            return f"内容获取错误"
 
-            for script in soup(['script', 'style', 'iframe', 'nav', 'footer', 'header', 'aside']):
-                script.decompose()
+    def extract_content_from_soup(self, soup):
+        """从已解析的页面提取正文（会移除脚本、导航等节点）"""
+        for script in soup(['script', 'style', 'iframe', 'nav', 'footer', 'header', 'aside']):
+            script.decompose()
 
-            content_selectors = [
-                soup.find('div', class_=re.compile(r'.*content.*|.*article.*|.*detail.*|.*post.*', re.I)),
-                soup.find('div', id=re.compile(r'.*content.*|.*article.*|.*main.*', re.I)),
-                soup.find('article'),
-            ]
+        content_selectors = [
+            soup.find('div', class_=re.compile(r'.*content.*|.*article.*|.*detail.*|.*post.*', re.I)),
+            soup.find('div', id=re.compile(r'.*content.*|.*article.*|.*main.*', re.I)),
+            soup.find('article'),
+        ]
 
-            for selector in content_selectors:
-                if selector:
-                    content = selector.get_text(strip=True, separator='\n')
-                    if len(content) > 100:
-                        return content[:1000]
+        for selector in content_selectors:
+            if selector:
+                content = selector.get_text(strip=True, separator='\n')
+                if len(content) > 100:
+                    return content[:1000]
 
-            body = soup.find('body')
-            if body:
-                content = body.get_text(strip=True, separator='\n')
-                return content[:1000]
+        body = soup.find('body')
+        if body:
+            content = body.get_text(strip=True, separator='\n')
+            return content[:1000]
 
-            return "内容获取失败"
-        except Exception as e:
-            return f"内容获取错误"
+        return "内容获取失败"
 
     def save_to_csv(self, filename='山西文旅新闻_全网爬取_10月1日至10日.csv'):
         """保存数据到CSV"""
@@ -626,23 +951,32 @@ class ShanxiTourismNewsCrawler:
             print("  安装命令: pip install selenium webdriver-manager")
 
         print("\n爬取策略（最大化数据采集）:")
-        print("  1. 政府官方网站 - 每站最多50条")
-        print("  2. 主流新闻网站 - 每站最多30条")
+        if self.focused:
+            print(f"  1-2. 政府/新闻网站聚焦爬取 - 深度{self.focus_max_depth}，每站最多{self.focus_page_budget}个页面")
+        else:
+            print("  1. 政府官方网站 - 每站最多50条")
+            print("  2. 主流新闻网站 - 每站最多30条")
         print("  3. 百度搜索 - 3个关键词 × 10页")
         print("  4. 微信公众号 - 8个关键词 × 50条")
         print("\n预估可采集数据量: 500+ 条")
         print("=" * 70)
 
         try:
-            # 1. 政府网站（最可靠）
-            print("\n【阶段1】政府官方网站")
-            print("-" * 70)
-            self.crawl_government_sites()
+            if self.focused:
+                # 1-2. 政府网站和主流新闻网站（按相关度深入频道页）
+                print("\n【阶段1-2】政府官方网站 + 主流新闻网站（聚焦爬取）")
+                print("-" * 70)
+                self.crawl_focused_sites()
+            else:
+                # 1. 政府网站（最可靠）
+                print("\n【阶段1】政府官方网站")
+                print("-" * 70)
+                self.crawl_government_sites()
 
-            # 2. 主流新闻网站
-            print("\n【阶段2】主流新闻网站")
-            print("-" * 70)
-            self.crawl_news_sites()
+                # 2. 主流新闻网站
+                print("\n【阶段2】主流新闻网站")
+                print("-" * 70)
+                self.crawl_news_sites()
 
             # 3. 搜索引擎 - 增加到10页，移除数据量限制
             print("\n【阶段3】搜索引擎深度爬取")
@@ -676,6 +1010,11 @@ class ShanxiTourismNewsCrawler:
         print("=" * 70)
         print(f"总采集新闻数: {len(self.news_data)} 条")
         print(f"已访问URL数: {len(self.visited_urls)} 个")
+        print(f"剩余重试预算: {self.retry_budget} 次")
+
+        open_hosts = [host for host, state in self.host_states.items() if state['state'] != 'closed']
+        if open_hosts:
+            print(f"已熔断主机: {', '.join(open_hosts)}")
 
         if self.news_data:
             sources = {}
@@ -693,5 +1032,16 @@ class ShanxiTourismNewsCrawler:
 
 
 if __name__ == '__main__':
-    crawler = ShanxiTourismNewsCrawler(use_selenium=True)
+    import argparse
+
+    parser = argparse.ArgumentParser(description='山西文旅新闻全网自动化爬虫')
+    parser.add_argument('--focused', action='store_true',
+                        help='聚焦爬取政府/新闻网站：按相关度优先深入站内频道页')
+    parser.add_argument('--max-depth', type=int, default=2, help='聚焦爬取最大深度（首页为0）')
+    parser.add_argument('--page-budget', type=int, default=40, help='聚焦爬取每个站点最多请求的页面数')
+    args = parser.parse_args()
+
+    crawler = ShanxiTourismNewsCrawler(use_selenium=True, focused=args.focused)
+    crawler.focus_max_depth = args.max_depth
+    crawler.focus_page_budget = args.page_budget
     crawler.run()